@@ -1,11 +1,21 @@
+import secrets
+from typing import Dict, Optional
+from urllib.parse import urlencode
 from fastapi import APIRouter, HTTPException, status, Request
 from fastapi.responses import RedirectResponse
 from app.core.config import settings
-from app.db.supabase_client import get_supabase_client
+from app.core.oauth import GOOGLE_AUTHORIZE_URL, generate_pkce_pair, pkce_authorize_url
+from app.db.resilience import UpstreamUnavailableError, supabase_auth
+from app.db.supabase_client import exchange_code_for_session
 
 
 router = APIRouter()
 
+# Holds "<state>.<code verifier>" of a pending PKCE login
+PKCE_FLOW_COOKIE = "pkce_flow"
+PKCE_COOKIE_PATH = f"{settings.API_V1_STR}/auth"
+PKCE_COOKIE_SECURE = (settings.GOOGLE_REDIRECT_URI or "").startswith("https://")
+
 
 @router.get('/login')
 async def login_google():
@@ -16,28 +26,113 @@ async def login_google():
     It will redirect to Google's login page, and after successful authentication,
     Google will redirect back to the Supabase auth callback URL, which will
     then redirect to your frontend with the tokens in the URL fragment.
+
+    With OAUTH_FLOW_TYPE=pkce, Supabase redirects to the /callback endpoint
+    with a code instead. The state and code verifier of the login are kept in
+    an HttpOnly cookie, so the callback can be served by any worker.
+
+    The redirect is built without touching the shared Supabase client (from a
+    precomputed URL in the implicit flow), so this endpoint is pure CPU work.
     """
-    try:
-        supabase = get_supabase_client()
-
-        # Initiate OAuth flow with Google
-        auth_response = supabase.auth.sign_in_with_oauth({
-            "provider": "google",
-            "options": {
-                "redirect_to": settings.GOOGLE_REDIRECT_URI
-            }
-        })
+    if settings.OAUTH_FLOW_TYPE != "pkce":
+        return RedirectResponse(url=GOOGLE_AUTHORIZE_URL)
 
-        if not auth_response or not hasattr(auth_response, 'url'):
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to initiate Google OAuth flow"
-            )
+    code_verifier, code_challenge = generate_pkce_pair()
+    state = secrets.token_urlsafe(16)
 
-        # Redirect to Google's consent page
-        return RedirectResponse(url=auth_response.url)
-    except Exception as e:
+    response = RedirectResponse(url=pkce_authorize_url(code_challenge, state))
+    response.set_cookie(
+        PKCE_FLOW_COOKIE,
+        f"{state}.{code_verifier}",
+        max_age=int(settings.PKCE_VERIFIER_TTL_SECONDS),
+        path=PKCE_COOKIE_PATH,
+        secure=PKCE_COOKIE_SECURE,
+        httponly=True,
+        samesite="lax",
+    )
+    return response
+
+
+def _frontend_redirect(params: Dict[str, str]) -> RedirectResponse:
+    """
+    Redirects to the frontend with `params` in the URL fragment, the way
+    Supabase hands over tokens and errors in the implicit flow.
+    """
+    response = RedirectResponse(
+        url=f"{settings.OAUTH_FRONTEND_REDIRECT_URI}#{urlencode(params)}",
+        status_code=status.HTTP_302_FOUND,
+    )
+    response.delete_cookie(
+        PKCE_FLOW_COOKIE,
+        path=PKCE_COOKIE_PATH,
+        secure=PKCE_COOKIE_SECURE,
+        httponly=True,
+        samesite="lax",
+    )
+    return response
+
+
+@router.get('/callback')
+async def oauth_callback(
+    request: Request,
+    code: Optional[str] = None,
+    state: Optional[str] = None,
+    error: Optional[str] = None,
+    error_description: Optional[str] = None,
+):
+    """
+    Completes a PKCE login started by /login.
+
+    Supabase redirects the browser here with an authorization code (or an
+    error). The code is exchanged, together with the code verifier kept for
+    this login, for a session, and the browser is redirected to
+    OAUTH_FRONTEND_REDIRECT_URI with the tokens or the error in the URL
+    fragment. When Supabase is unavailable the login cookie is kept, so
+    reloading this page retries the exchange.
+    """
+    if error:
+        return _frontend_redirect({"error": error, "error_description": error_description or ""})
+
+    expected_state, _, code_verifier = request.cookies.get(PKCE_FLOW_COOKIE, "").partition(".")
+    if not code or not code_verifier or not secrets.compare_digest((state or "").encode(), expected_state.encode()):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error initiating Google OAuth flow: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Login expired or was not started here, please log in again"
         )
+
+    try:
+        # Auth codes are single-use, so the exchange is not retried once sent
+        auth_response = await supabase_auth.call(
+            "auth.exchange_code_for_session",
+            lambda: exchange_code_for_session(code, code_verifier),
+            idempotent=False,
+        )
+    except UpstreamUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Authentication service unavailable: {str(e)}",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except Exception as e:
+        return _frontend_redirect({
+            "error": "invalid_grant",
+            "error_description": f"Error completing Google OAuth flow: {str(e)}",
+        })
+
+    session = auth_response.session
+    if not session:
+        return _frontend_redirect({
+            "error": "server_error",
+            "error_description": "Failed to complete Google OAuth flow",
+        })
+
+    params = {
+        "access_token": session.access_token,
+        "refresh_token": session.refresh_token,
+        "expires_in": str(session.expires_in),
+        "expires_at": str(session.expires_at),
+        "token_type": session.token_type,
+    }
+    if session.provider_token:
+        params["provider_token"] = session.provider_token
+    return _frontend_redirect(params)
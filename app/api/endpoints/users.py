@@ -1,54 +1,142 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+import hashlib
+import jwt
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Response
 from typing import Optional
-from app.db.supabase_client import get_supabase_client
+from app.core.config import settings
+from app.core.metrics import timer
+from app.core.security import LocalVerificationUnavailable, verify_token
+from app.core.token_cache import token_cache
+from app.db.resilience import UpstreamUnavailableError, supabase_auth
+from app.db.supabase_client import get_auth_client
+from app.models.user import UserProfile
 
 router = APIRouter()
 
 
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def _get_user_from_supabase(token: str):
+    """
+    Verifies the token by asking Supabase for the user it belongs to.
+    Responds with 503 rather than 401 when Supabase itself is unavailable,
+    so clients don't start logging in again.
+    """
+    try:
+        user_response = await supabase_auth.call(
+            "auth.get_user",
+            lambda: get_auth_client().get_user(token),
+            hedge=True,
+        )
+    except UpstreamUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Authentication service unavailable: {str(e)}",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except Exception as e:
+        raise _unauthorized(f"Authentication error: {str(e)}")
+
+    if not user_response or not user_response.user:
+        raise _unauthorized("Invalid token or user not found")
+
+    return user_response.user
+
+
+async def _verify_token(token: str):
+    """
+    Depending on AUTH_VERIFICATION_MODE the token is verified locally,
+    locally with a fallback to Supabase, or by Supabase only.
+    """
+    mode = settings.AUTH_VERIFICATION_MODE
+    if mode != "remote":
+        try:
+            return await verify_token(token)
+        except jwt.InvalidTokenError as e:
+            raise _unauthorized(f"Authentication error: {str(e)}")
+        except LocalVerificationUnavailable as e:
+            if mode == "local":
+                raise _unauthorized(f"Authentication error: {str(e)}")
+
+    return await _get_user_from_supabase(token)
+
+
 async def get_current_user(authorization: Optional[str] = Header(None)):
     """
     Verify the JWT token and return the user information.
     This can be used as a dependency for protected routes.
+
+    Verified users and rejected tokens are cached briefly, see TokenCache.
     """
     if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _unauthorized("Invalid authentication credentials")
 
     token = authorization.replace("Bearer ", "")
 
-    try:
-        supabase = get_supabase_client()
-        user_response = supabase.auth.get_user(token)
+    with timer("auth"):
+        return await token_cache.get_or_verify(token, _verify_token)
 
-        if not user_response or not hasattr(user_response, 'user'):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token or user not found",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
 
-        return user_response.user
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Authentication error: {str(e)}",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison of an ETag against an If-None-Match header.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
 
 
-@router.get("/me")
-async def get_user_info(current_user=Depends(get_current_user)):
+@router.get("/me", response_model=UserProfile)
+async def get_user_info(
+    current_user=Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None),
+):
     """
     Returns information about the currently authenticated user.
     This endpoint requires authentication.
+
+    The response carries an ETag derived from the user's id and updated_at,
+    and polls with a matching If-None-Match get an empty 304.
     """
-    return {
-        "id": current_user.id,
-        "email": current_user.email,
-        "user_metadata": current_user.user_metadata,
-        "app_metadata": current_user.app_metadata,
-        "created_at": current_user.created_at,
+    profile = UserProfile.model_construct(
+        id=current_user.id,
+        email=current_user.email,
+        user_metadata=current_user.user_metadata,
+        app_metadata=current_user.app_metadata,
+        created_at=current_user.created_at,
+    )
+    body = None
+    updated_at = getattr(current_user, "updated_at", None)
+    if updated_at is not None:
+        version = f"{current_user.id}:{updated_at.isoformat()}".encode()
+    else:
+        # Locally verified users have no updated_at, so hash the body instead
+        body = profile.model_dump_json().encode()
+        version = body
+    etag = f'"{hashlib.sha256(version).hexdigest()[:32]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
     }
+
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if body is None:
+        body = profile.model_dump_json().encode()
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,203 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.metrics import Counter, Gauge, register, route_template
+
+ADMISSION_REJECTED = register(Counter(
+    "admission_rejected_total", "Requests shed by admission control", ("route", "reason"),
+))
+ADMISSION_LIMIT = register(Gauge(
+    "admission_concurrency_limit", "Current concurrency limit per route", ("route",),
+))
+ADMISSION_QUEUED = register(Gauge(
+    "admission_queued_requests", "Requests waiting for a concurrency slot", ("route",),
+))
+
+
+class ConcurrencyLimiter:
+    """
+    Limits the number of requests in flight for one route.
+
+    Requests over the limit wait in a bounded FIFO queue for at most
+    `queue_timeout` seconds. They are turned away immediately when the queue
+    is full or when the estimated wait is already past the deadline.
+
+    With `adaptive`, the limit is tuned with AIMD between `min_limit` and
+    `max_limit`: it grows by about one per round trip while requests finish
+    under `latency_target`, and shrinks by 10% (at most once per
+    `latency_target`) while the smoothed latency is over it, so a single
+    slow request doesn't lower the limit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        queue_size: int,
+        queue_timeout: float,
+        adaptive: bool = False,
+        min_limit: int = 1,
+        latency_target: float = 0.5,
+    ):
+        self.name = name
+        self.limit = float(limit)
+        self.max_limit = limit
+        self.min_limit = min(min_limit, limit)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.adaptive = adaptive
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._avg_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        ADMISSION_LIMIT.set(name, value=limit)
+
+    def _estimated_wait(self) -> float:
+        if self._avg_latency is None:
+            return 0.0
+        return (len(self._waiters) + 1) / max(int(self.limit), 1) * self._avg_latency
+
+    async def acquire(self) -> Optional[str]:
+        """
+        Waits for a slot. Returns None once admitted, or the reason the
+        request was rejected ("queue_full" or "queue_timeout").
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+        if self._estimated_wait() > self.queue_timeout:
+            return "queue_timeout"
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        ADMISSION_QUEUED.inc(self.name)
+        try:
+            # wait_for still returns normally if the slot was granted at the deadline
+            await asyncio.wait_for(future, self.queue_timeout)
+            return None
+        except asyncio.TimeoutError:
+            return "queue_timeout"
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the request was cancelled
+                self.in_flight -= 1
+                self._wake_waiters()
+            raise
+        finally:
+            ADMISSION_QUEUED.dec(self.name)
+            try:
+                self._waiters.remove(future)
+            except ValueError:
+                pass
+
+    def release(self, latency: float) -> None:
+        """
+        Frees the slot of a request that took `latency` seconds.
+        """
+        if self._avg_latency is None:
+            self._avg_latency = latency
+        else:
+            self._avg_latency += 0.1 * (latency - self._avg_latency)
+        if self.adaptive:
+            self._adjust_limit(latency)
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _adjust_limit(self, latency: float) -> None:
+        if self._avg_latency > self.latency_target:
+            now = time.monotonic()
+            if now - self._last_decrease < self.latency_target:
+                return
+            self._last_decrease = now
+            self.limit = max(float(self.min_limit), self.limit * 0.9)
+        elif latency <= self.latency_target and self.limit < self.max_limit:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        else:
+            return
+        ADMISSION_LIMIT.set(self.name, value=int(self.limit))
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+
+class AdmissionControlMiddleware:
+    """
+    Sheds load with a fast 503 and Retry-After instead of letting requests
+    queue behind slow upstream calls. Each route gets its own
+    ConcurrencyLimiter; `route_limits` overrides `max_in_flight` per route
+    template and `exempt_paths` (e.g. /health) are never limited.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_in_flight: int,
+        queue_size: int,
+        queue_timeout_ms: float,
+        retry_after_seconds: int,
+        route_limits: Optional[Dict[str, int]] = None,
+        exempt_paths: Iterable[str] = (),
+        adaptive: bool = False,
+        min_in_flight: int = 1,
+        latency_target_ms: float = 500.0,
+    ):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.retry_after = str(retry_after_seconds)
+        self.route_limits = route_limits or {}
+        self.exempt_paths = frozenset(exempt_paths)
+        self.adaptive = adaptive
+        self.min_in_flight = min_in_flight
+        self.latency_target = latency_target_ms / 1000
+        self._limiters: Dict[str, ConcurrencyLimiter] = {}
+
+    def _limiter(self, route: str) -> ConcurrencyLimiter:
+        limiter = self._limiters.get(route)
+        if limiter is None:
+            limiter = self._limiters[route] = ConcurrencyLimiter(
+                route,
+                limit=self.route_limits.get(route, self.max_in_flight),
+                queue_size=self.queue_size,
+                queue_timeout=self.queue_timeout,
+                adaptive=self.adaptive,
+                min_limit=self.min_in_flight,
+                latency_target=self.latency_target,
+            )
+        return limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        route = route_template(scope)
+        limiter = self._limiter(route)
+        rejection = await limiter.acquire()
+        if rejection is not None:
+            ADMISSION_REJECTED.inc(route, rejection)
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry later"},
+                status_code=503,
+                headers={"Retry-After": self.retry_after},
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start)
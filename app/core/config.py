@@ -1,5 +1,7 @@
 import os
+from typing import Dict, List, Literal, Optional
 from dotenv import load_dotenv
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
 load_dotenv()
@@ -11,14 +13,103 @@ class Settings(BaseSettings):
 
     SUPABASE_PROJECT_URL: str = os.getenv("SUPABASE_PROJECT_URL")
     SUPABASE_ANON_KEY: str = os.getenv("SUPABASE_ANON_KEY")
+    SUPABASE_JWT_SECRET: Optional[str] = os.getenv("SUPABASE_JWT_SECRET")
 
     GOOGLE_CLIENT_ID: str = os.getenv("GOOGLE_CLIENT_ID")
     GOOGLE_CLIENT_SECRET: str = os.getenv("GOOGLE_CLIENT_SECRET")
     GOOGLE_REDIRECT_URI: str = os.getenv("GOOGLE_REDIRECT_URI")
 
+    # OAuth flow started by /auth/login:
+    #   "implicit" - Supabase redirects to GOOGLE_REDIRECT_URI with the tokens
+    #                in the URL fragment
+    #   "pkce"     - GOOGLE_REDIRECT_URI must be this server's
+    #                <API_V1_STR>/auth/callback (allow-listed in Supabase with a
+    #                trailing ** for its state parameter). The callback exchanges
+    #                the code and redirects to OAUTH_FRONTEND_REDIRECT_URI with
+    #                the tokens in the URL fragment, as the implicit flow does.
+    OAUTH_FLOW_TYPE: Literal["implicit", "pkce"] = "implicit"
+    OAUTH_FRONTEND_REDIRECT_URI: Optional[str] = None
+    # Lifetime of the HttpOnly cookie holding the PKCE state and code verifier
+    PKCE_VERIFIER_TTL_SECONDS: float = 600.0
+
+    # How access tokens are verified:
+    #   "local"             - check signature and claims locally only
+    #   "local_then_remote" - check locally, ask Supabase when no key is available
+    #   "remote"            - always ask Supabase (auth.get_user)
+    # Locally verified users only have what the token carries, so /users/me
+    # returns "created_at": null for them.
+    AUTH_VERIFICATION_MODE: Literal["local", "local_then_remote", "remote"] = "remote"
+    AUTH_JWT_AUDIENCE: str = "authenticated"
+    # Defaults to <SUPABASE_PROJECT_URL>/auth/v1
+    AUTH_JWT_ISSUER: Optional[str] = None
+    AUTH_JWT_LEEWAY_SECONDS: int = 10
+    # Signing keys are refreshed in the background after this interval, and
+    # at most once per minimum interval when a token uses an unknown key id.
+    JWKS_REFRESH_INTERVAL_SECONDS: int = 600
+    JWKS_MIN_REFRESH_INTERVAL_SECONDS: int = 30
+
+    # Cache of verified tokens in front of get_current_user. A token stays
+    # accepted for up to the TTL after it is revoked upstream.
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: float = 60.0
+    TOKEN_CACHE_NEGATIVE_TTL_SECONDS: float = 10.0
+
+    # Shared keep-alive connection pool for calls to Supabase
+    SUPABASE_HTTP2: bool = True
+    SUPABASE_HTTP_TIMEOUT_SECONDS: float = 10.0
+    SUPABASE_HTTP_MAX_CONNECTIONS: int = 100
+    SUPABASE_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    SUPABASE_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+
+    # Resilience for outbound Supabase auth calls: a total deadline per call,
+    # jittered retries of transient failures (limited to a fraction of calls),
+    # hedged requests past the p95 latency, and a circuit breaker
+    SUPABASE_CALL_DEADLINE_MS: float = 3000.0
+    SUPABASE_MAX_RETRIES: int = 2
+    SUPABASE_RETRY_BASE_DELAY_MS: float = 50.0
+    SUPABASE_RETRY_MAX_DELAY_MS: float = 500.0
+    SUPABASE_RETRY_BUDGET_RATIO: float = 0.1
+    SUPABASE_HEDGING_ENABLED: bool = True
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RESET_SECONDS: float = 10.0
+
+    # Production server (python -m app.serve)
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    # Worker processes; 0 means one per available CPU
+    WEB_CONCURRENCY: int = 0
+    GRACEFUL_SHUTDOWN_TIMEOUT_SECONDS: int = 30
+    KEEP_ALIVE_TIMEOUT_SECONDS: int = 5
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+    ACCESS_LOG: bool = False
+
+    # Requests slower than this are logged with their timing breakdown
+    SLOW_REQUEST_THRESHOLD_MS: float = 1000.0
+
+    # Admission control: per-route concurrency limits with a bounded wait
+    # queue. Requests that can't get a slot in time get a 503 + Retry-After.
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_IN_FLIGHT: int = 100
+    # Per-route overrides, e.g. {"/api/v1/users/me": 50}
+    ADMISSION_ROUTE_LIMITS: Dict[str, int] = {}
+    ADMISSION_QUEUE_SIZE: int = 100
+    ADMISSION_QUEUE_TIMEOUT_MS: float = 500.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    ADMISSION_EXEMPT_PATHS: List[str] = ["/health", "/metrics"]
+    # Tune each route's limit (AIMD) to keep latency under the target
+    ADMISSION_ADAPTIVE: bool = True
+    ADMISSION_MIN_IN_FLIGHT: int = 4
+    ADMISSION_LATENCY_TARGET_MS: float = 500.0
+
     model_config = {
         "case_sensitive": True
     }
 
+    @model_validator(mode="after")
+    def _check_oauth_flow(self) -> "Settings":
+        if self.OAUTH_FLOW_TYPE == "pkce" and not self.OAUTH_FRONTEND_REDIRECT_URI:
+            raise ValueError("OAUTH_FLOW_TYPE=pkce requires OAUTH_FRONTEND_REDIRECT_URI")
+        return self
+
 
 settings = Settings()
@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Named timings of the current request, reported in Server-Timing headers
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {value}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield "", _format_labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        self._values[labels] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[0][i] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    def samples(self):
+        names = self.labelnames + ("le",)
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", _format_labels(names, labels + (repr(bound),)), cumulative
+            yield "_bucket", _format_labels(names, labels + ("+Inf",)), count
+            yield "_sum", _format_labels(self.labelnames, labels), total
+            yield "_count", _format_labels(self.labelnames, labels), count
+
+
+class StatsCollector(_Metric):
+    """
+    Exposes a dict of numbers returned by `stats` as one gauge per key,
+    named `<name>_<key>`.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, stats: Callable[[], Dict[str, float]]):
+        super().__init__(name, documentation)
+        self._stats = stats
+
+    def render(self) -> str:
+        lines = []
+        for key, value in self._stats().items():
+            metric_name = f"{self.name}_{key}"
+            lines.append(f"# HELP {metric_name} {self.documentation} ({key})")
+            lines.append(f"# TYPE {metric_name} {self.type}")
+            lines.append(f"{metric_name} {value}")
+        return "\n".join(lines)
+
+
+REGISTRY: List[_Metric] = []
+
+
+def register(metric: _Metric) -> _Metric:
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    """
+    Renders every registered metric in the Prometheus text format.
+    Metrics are kept per process; each worker reports its own.
+    """
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+REQUEST_DURATION = register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route"),
+))
+REQUESTS_TOTAL = register(Counter(
+    "http_requests_total", "HTTP requests by status code", ("method", "route", "status"),
+))
+REQUESTS_IN_FLIGHT = register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", ("route",),
+))
+UPSTREAM_DURATION = register(Histogram(
+    "supabase_request_duration_seconds", "Latency of outbound Supabase calls", ("operation", "outcome"),
+))
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """
+    Records how long the block takes as a named timing of the current request.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((name, time.perf_counter() - start))
+
+
+@contextmanager
+def track_upstream(operation: str) -> Iterator[None]:
+    """
+    Times an outbound Supabase call, e.g. `with track_upstream("auth.get_user"):`.
+    Calls cancelled by us (a hedge that lost, a deadline) are recorded with
+    outcome "cancelled" and left out of Server-Timing.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        UPSTREAM_DURATION.observe(duration, operation, outcome)
+        timings = _request_timings.get()
+        if timings is not None and outcome != "cancelled":
+            timings.append((f"supabase.{operation}", duration))
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Returns the path template of the route matching the request (e.g.
+    "/api/v1/users/me"), so metrics don't get one label per raw path.
+    The result is kept in the scope for the other middlewares.
+    """
+    template = scope.get("route_template")
+    if template is None:
+        template = "unmatched"
+        for route in getattr(scope.get("app"), "routes", ()):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = route.path
+                break
+        scope["route_template"] = template
+    return template
+
+
+def _server_timing(total: float, timings: List[Tuple[str, float]]) -> str:
+    entries = [f"app;dur={total * 1000:.3f}"]
+    entries.extend(f"{name};dur={duration * 1000:.3f}" for name, duration in timings)
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """
+    Records per-route latency, in-flight and status code metrics, adds a
+    Server-Timing header to every response, and logs requests slower than
+    `slow_request_threshold_ms` with their timing breakdown.
+    """
+
+    def __init__(self, app: ASGIApp, slow_request_threshold_ms: float):
+        self.app = app
+        self.slow_request_threshold = slow_request_threshold_ms / 1000
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", _server_timing(time.perf_counter() - start, timings))
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc(route)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            duration = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec(route)
+            REQUEST_DURATION.observe(duration, method, route)
+            REQUESTS_TOTAL.inc(method, route, str(status_code))
+            if duration > self.slow_request_threshold:
+                logger.warning(
+                    "Slow request: %s %s -> %s in %.1fms (%s)",
+                    method, scope["path"], status_code, duration * 1000,
+                    _server_timing(duration, timings),
+                )
+            _request_timings.reset(token)
@@ -0,0 +1,45 @@
+import base64
+import hashlib
+import secrets
+from typing import Dict, Tuple
+from urllib.parse import urlencode
+
+from app.core.config import settings
+from app.db.supabase_client import SUPABASE_AUTH_URL
+
+# Supabase's Google authorize URL, built once instead of on every login
+GOOGLE_AUTHORIZE_URL = f"{SUPABASE_AUTH_URL}/authorize?" + urlencode({
+    "provider": "google",
+    "redirect_to": settings.GOOGLE_REDIRECT_URI or "",
+})
+
+
+def generate_pkce_pair() -> Tuple[str, str]:
+    """
+    Returns a new PKCE code verifier and its S256 code challenge.
+    """
+    verifier = secrets.token_urlsafe(48)
+    digest = hashlib.sha256(verifier.encode("ascii")).digest()
+    challenge = base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+    return verifier, challenge
+
+
+def add_url_params(url: str, params: Dict[str, str]) -> str:
+    """
+    Appends query parameters to a URL that may already have some.
+    """
+    return url + ("&" if "?" in url else "?") + urlencode(params)
+
+
+def pkce_authorize_url(code_challenge: str, state: str) -> str:
+    """
+    Returns the Google authorize URL for a PKCE login with the given
+    challenge. `state` is passed back to the callback through its redirect URL.
+    """
+    return f"{SUPABASE_AUTH_URL}/authorize?" + urlencode({
+        "provider": "google",
+        "redirect_to": add_url_params(settings.GOOGLE_REDIRECT_URI or "", {"state": state}),
+        "code_challenge": code_challenge,
+        "code_challenge_method": "s256",
+    })
+
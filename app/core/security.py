@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import jwt
+from gotrue.types import User
+from app.core.config import settings
+from app.core.metrics import track_upstream
+from app.db.supabase_client import SUPABASE_AUTH_URL, get_http_client
+
+logger = logging.getLogger(__name__)
+
+
+class LocalVerificationUnavailable(Exception):
+    """
+    Raised when there is no key to verify a token locally,
+    so the token has to be checked by Supabase instead.
+    """
+
+
+class SigningKeyCache:
+    """
+    Caches the keys used to verify Supabase access tokens.
+
+    HS256 tokens are checked against the project's JWT secret. Asymmetric
+    tokens are checked against the project's JWKS, which is refreshed in the
+    background once it is older than `refresh_interval`, and on demand
+    (at most once per `min_refresh_interval`) when a token references a key id
+    we have not seen yet, so key rotation is picked up without a restart.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        secret: Optional[str],
+        refresh_interval: float,
+        min_refresh_interval: float,
+    ):
+        self.jwks_url = jwks_url
+        self._secret = secret
+        self._refresh_interval = refresh_interval
+        self._min_refresh_interval = min_refresh_interval
+        self._keys: Dict[Optional[str], jwt.PyJWK] = {}
+        self._fetched_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> None:
+        """
+        Fetches the JWKS and replaces the cached keys.
+        On failure the previous keys are kept.
+        """
+        self._fetched_at = time.monotonic()
+        try:
+            with track_upstream("auth.jwks"):
+                response = await get_http_client().get(self.jwks_url, timeout=5.0)
+                response.raise_for_status()
+            jwks = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning("Failed to refresh JWKS from %s: %s", self.jwks_url, e)
+            return
+
+        keys = {}
+        for jwk in jwks.get("keys", []):
+            try:
+                keys[jwk.get("kid")] = jwt.PyJWK(jwk)
+            except jwt.PyJWTError as e:
+                logger.warning("Skipping unusable JWK %r: %s", jwk.get("kid"), e)
+        if jwks.get("keys") and not keys:
+            logger.error(
+                "None of the %d keys from %s could be loaded, asymmetric tokens "
+                "can't be verified locally", len(jwks["keys"]), self.jwks_url,
+            )
+        self._keys = keys
+
+    def _schedule_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self.refresh())
+        return self._refresh_task
+
+    def _age(self) -> float:
+        if self._fetched_at is None:
+            return float("inf")
+        return time.monotonic() - self._fetched_at
+
+    async def get_key(self, header: Dict[str, Any]) -> Tuple[Any, List[str]]:
+        """
+        Returns the verification key and allowed algorithms for a token header.
+        """
+        alg = header.get("alg")
+        if alg == "HS256":
+            if not self._secret:
+                raise LocalVerificationUnavailable("No JWT secret configured")
+            return self._secret, ["HS256"]
+
+        kid = header.get("kid")
+        if kid not in self._keys and self._age() >= self._min_refresh_interval:
+            # Unknown key id, possibly a rotation: refresh before giving up.
+            # Shielded so a cancelled request does not cancel the shared refresh.
+            await asyncio.shield(self._schedule_refresh())
+        elif self._age() >= self._refresh_interval:
+            self._schedule_refresh()
+
+        key = self._keys.get(kid)
+        if key is None:
+            raise LocalVerificationUnavailable(f"No signing key for kid {kid!r}")
+        if key.algorithm_name != alg:
+            raise jwt.InvalidAlgorithmError(f"Token algorithm {alg!r} does not match its key")
+        return key.key, [key.algorithm_name]
+
+
+signing_keys = SigningKeyCache(
+    jwks_url=f"{SUPABASE_AUTH_URL}/.well-known/jwks.json",
+    secret=settings.SUPABASE_JWT_SECRET,
+    refresh_interval=settings.JWKS_REFRESH_INTERVAL_SECONDS,
+    min_refresh_interval=settings.JWKS_MIN_REFRESH_INTERVAL_SECONDS,
+)
+
+
+def user_from_claims(claims: Dict[str, Any]) -> User:
+    """
+    Builds a user from the claims of a verified access token.
+    Access tokens don't carry `created_at`, so it is left empty.
+    """
+    return User.model_construct(
+        id=claims["sub"],
+        aud=claims.get("aud"),
+        role=claims.get("role"),
+        email=claims.get("email") or None,
+        phone=claims.get("phone") or None,
+        app_metadata=claims.get("app_metadata") or {},
+        user_metadata=claims.get("user_metadata") or {},
+        created_at=None,
+    )
+
+
+async def verify_token(token: str) -> User:
+    """
+    Verifies a Supabase access token locally (signature, exp, nbf, aud, iss)
+    and returns the user described by its claims.
+
+    Raises jwt.InvalidTokenError if the token is invalid and
+    LocalVerificationUnavailable if there is no key to check it with.
+    """
+    header = jwt.get_unverified_header(token)
+    key, algorithms = await signing_keys.get_key(header)
+    claims = jwt.decode(
+        token,
+        key,
+        algorithms=algorithms,
+        audience=settings.AUTH_JWT_AUDIENCE,
+        issuer=settings.AUTH_JWT_ISSUER or SUPABASE_AUTH_URL,
+        leeway=settings.AUTH_JWT_LEEWAY_SECONDS,
+        options={"require": ["exp", "sub"]},
+    )
+    return user_from_claims(claims)
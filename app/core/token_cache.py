@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import jwt
+from fastapi import HTTPException, status
+from app.core.config import settings
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified users, keyed by a SHA-256 hash of the
+    access token so raw tokens are never kept in memory.
+
+    Entries expire at the earlier of `ttl` and the token's own `exp`.
+    Rejected tokens (401s) are remembered for `negative_ttl`.
+    Concurrent lookups of the same uncached token share one verification.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, negative_ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # key -> (expires_at, user, rejection detail)
+        self._entries: "OrderedDict[bytes, Tuple[float, Any, Optional[Any]]]" = OrderedDict()
+        self._pending: Dict[bytes, asyncio.Task] = {}
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def _token_ttl(self, token: str) -> float:
+        try:
+            exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+        except jwt.PyJWTError:
+            exp = None
+        if not isinstance(exp, (int, float)):
+            return self.ttl
+        return min(self.ttl, exp - time.time())
+
+    def _store(self, key: bytes, ttl: float, user: Any, rejection: Optional[Any]) -> None:
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, user, rejection)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_verify(self, token: str, verify: Callable[[str], Awaitable[Any]]) -> Any:
+        """
+        Returns the cached user for `token`, or verifies it with `verify`.
+        Cached rejections are raised again as a 401 HTTPException.
+        """
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, user, rejection = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                if rejection is not None:
+                    self.negative_hits += 1
+                    raise HTTPException(
+                        status_code=status.HTTP_401_UNAUTHORIZED,
+                        detail=rejection,
+                        headers={"WWW-Authenticate": "Bearer"},
+                    )
+                self.hits += 1
+                return user
+            del self._entries[key]
+
+        task = self._pending.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._verify_and_store(key, token, verify))
+            # Retrieve the outcome even if every waiter was cancelled, so a
+            # failed verification isn't logged as "never retrieved"
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._pending[key] = task
+        # Shielded so one cancelled request does not fail the others waiting on it
+        return await asyncio.shield(task)
+
+    async def _verify_and_store(self, key: bytes, token: str, verify: Callable[[str], Awaitable[Any]]) -> Any:
+        try:
+            user = await verify(token)
+        except HTTPException as e:
+            if e.status_code == status.HTTP_401_UNAUTHORIZED:
+                self._store(key, self.negative_ttl, None, e.detail)
+            raise
+        else:
+            self._store(key, self._token_ttl(token), user, None)
+            return user
+        finally:
+            self._pending.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
+
+
+token_cache = TokenCache(
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+    ttl=settings.TOKEN_CACHE_TTL_SECONDS,
+    negative_ttl=settings.TOKEN_CACHE_NEGATIVE_TTL_SECONDS,
+)
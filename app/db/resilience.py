@@ -0,0 +1,293 @@
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import httpx
+from gotrue.errors import AuthApiError, AuthRetryableError, AuthUnknownError
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, register, track_upstream
+
+T = TypeVar("T")
+
+UPSTREAM_RETRIES = register(Counter(
+    "supabase_retries_total", "Retried outbound Supabase calls", ("operation",),
+))
+UPSTREAM_HEDGES = register(Counter(
+    "supabase_hedged_requests_total", "Hedged second requests sent to Supabase", ("operation",),
+))
+UPSTREAM_FAILURES = register(Counter(
+    "supabase_unavailable_total", "Supabase calls failed fast or given up on", ("operation", "reason"),
+))
+CIRCUIT_STATE = register(Gauge(
+    "supabase_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ("upstream",),
+))
+
+
+class UpstreamUnavailableError(Exception):
+    """
+    Raised when Supabase is unhealthy (circuit open) or didn't answer
+    within the call's deadline and retry budget.
+    """
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Whether an error means Supabase is struggling (worth retrying), as opposed
+    to a definitive answer such as an invalid token.
+    """
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError, AuthRetryableError, AuthUnknownError)):
+        return True
+    if isinstance(error, AuthApiError):
+        return error.status >= 500 or error.status == 429
+    return False
+
+
+def was_not_sent(error: BaseException) -> bool:
+    """
+    Whether an error means the request never reached the upstream (no
+    connection could be made), so even a non-idempotent call can be retried.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            return True
+        seen.add(id(error))
+        # gotrue re-raises transport errors as AuthRetryableError
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive transient failures and fails
+    fast for `reset_timeout` seconds. Then a single probe call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+        self._set_state(self.CLOSED)
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        CIRCUIT_STATE.set(self.name, value=(self.CLOSED, self.HALF_OPEN, self.OPEN).index(state))
+
+    def retry_after(self) -> int:
+        remaining = self._opened_at + self.reset_timeout - time.monotonic()
+        return max(1, math.ceil(remaining))
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            self._set_state(self.HALF_OPEN)
+            self._probe_started_at = None
+        if self.state == self.HALF_OPEN:
+            # Only one probe at a time; a probe that never reports back expires
+            if self._probe_started_at is not None and now - self._probe_started_at < self.reset_timeout:
+                return False
+            self._probe_started_at = now
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to `ratio` of calls (plus a small reserve),
+    so retries can't multiply load on an upstream that is already struggling.
+    """
+
+    def __init__(self, ratio: float, reserve: float = 10.0):
+        self.ratio = ratio
+        self.capacity = reserve
+        self._tokens = reserve
+
+    def deposit(self) -> None:
+        self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class LatencyTracker:
+    """
+    Keeps the latencies of recent successful calls to estimate their p95.
+    """
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._min_samples = min_samples
+        self._p95: Optional[float] = None
+        self._stale = 0
+
+    def observe(self, latency: float) -> None:
+        self._samples.append(latency)
+        self._stale += 1
+
+    def p95(self) -> Optional[float]:
+        if len(self._samples) < self._min_samples:
+            return None
+        if self._p95 is None or self._stale >= 10:
+            ordered = sorted(self._samples)
+            self._p95 = ordered[int(len(ordered) * 0.95) - 1]
+            self._stale = 0
+        return self._p95
+
+
+class ResilientCaller:
+    """
+    Runs outbound calls to one upstream with a deadline per call, retries of
+    transient failures with full-jitter backoff within a retry budget,
+    optional hedging (a second request once the first passes the p95
+    latency) and a circuit breaker that fails fast while the upstream is
+    unhealthy.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        deadline: float,
+        max_retries: int,
+        base_delay: float,
+        max_delay: float,
+        retry_budget_ratio: float,
+        failure_threshold: int,
+        reset_timeout: float,
+        hedging: bool = True,
+    ):
+        self.name = name
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedging = hedging
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.retry_budget = RetryBudget(retry_budget_ratio)
+        self._latencies: Dict[str, LatencyTracker] = {}
+
+    def _fail(self, operation: str, reason: str, message: str) -> UpstreamUnavailableError:
+        UPSTREAM_FAILURES.inc(operation, reason)
+        retry_after = self.breaker.retry_after() if self.breaker.state == CircuitBreaker.OPEN else 1
+        return UpstreamUnavailableError(f"{self.name} {message}", retry_after)
+
+    async def _timed(self, operation: str, fn: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        with track_upstream(operation):
+            result = await fn()
+        self._latencies[operation].observe(time.perf_counter() - start)
+        return result
+
+    async def _attempt(self, operation: str, fn: Callable[[], Awaitable[T]], hedge: bool) -> T:
+        hedge_after = self._latencies[operation].p95() if hedge and self.hedging else None
+        if hedge_after is None:
+            return await self._timed(operation, fn)
+
+        tasks = {asyncio.ensure_future(self._timed(operation, fn))}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                UPSTREAM_HEDGES.inc(operation)
+                tasks.add(asyncio.ensure_future(self._timed(operation, fn)))
+            while True:
+                done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not pending:
+                    return done.pop().result()
+                tasks = pending
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def call(
+        self,
+        operation: str,
+        fn: Callable[[], Awaitable[T]],
+        hedge: bool = False,
+        idempotent: bool = True,
+    ) -> T:
+        """
+        Calls `fn` (a zero-argument coroutine function) under this caller's
+        policies. Only pass `hedge=True` for idempotent calls. Calls made
+        with `idempotent=False` are never hedged, and only retried when the
+        request didn't reach the upstream.
+
+        Raises UpstreamUnavailableError when the upstream is unhealthy or the
+        deadline runs out; definitive errors from the upstream are re-raised.
+        """
+        if operation not in self._latencies:
+            self._latencies[operation] = LatencyTracker()
+        if not self.breaker.allow():
+            raise self._fail(operation, "circuit_open", "is unavailable (circuit open)")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = await asyncio.wait_for(
+                    self._attempt(operation, fn, hedge and idempotent), deadline - loop.time()
+                )
+            except Exception as e:
+                if not is_transient(e):
+                    # The upstream answered, it just said no
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                retryable = idempotent or was_not_sent(e)
+                if attempt > self.max_retries or not retryable or not self.retry_budget.withdraw():
+                    raise self._fail(operation, "retries_exhausted", f"call failed: {str(e) or type(e).__name__}") from e
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+                if loop.time() + delay >= deadline:
+                    raise self._fail(operation, "deadline", "call ran out of time") from e
+                UPSTREAM_RETRIES.inc(operation)
+                await asyncio.sleep(delay)
+                if not self.breaker.allow():
+                    raise self._fail(operation, "circuit_open", "is unavailable (circuit open)") from e
+            else:
+                self.breaker.record_success()
+                return result
+
+
+supabase_auth = ResilientCaller(
+    "supabase_auth",
+    deadline=settings.SUPABASE_CALL_DEADLINE_MS / 1000,
+    max_retries=settings.SUPABASE_MAX_RETRIES,
+    base_delay=settings.SUPABASE_RETRY_BASE_DELAY_MS / 1000,
+    max_delay=settings.SUPABASE_RETRY_MAX_DELAY_MS / 1000,
+    retry_budget_ratio=settings.SUPABASE_RETRY_BUDGET_RATIO,
+    failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.CIRCUIT_BREAKER_RESET_SECONDS,
+    hedging=settings.SUPABASE_HEDGING_ENABLED,
+)
@@ -1,21 +1,126 @@
-from supabase import create_client, Client
+from typing import TYPE_CHECKING, Optional
+
+import httpx
+from gotrue import AsyncGoTrueClient
+from gotrue.helpers import handle_exception, parse_auth_response
+from gotrue.types import AuthResponse
 from app.core.config import settings
 
-# Global client instance
+if TYPE_CHECKING:
+    from supabase import Client
+
+SUPABASE_AUTH_URL = f"{(settings.SUPABASE_PROJECT_URL or '').rstrip('/')}/auth/v1"
+SUPABASE_AUTH_HEADERS = {
+    "apiKey": settings.SUPABASE_ANON_KEY,
+    "Authorization": f"Bearer {settings.SUPABASE_ANON_KEY}",
+}
+
+# Global client instances
 _supabase_client = None
+_http_client: Optional[httpx.AsyncClient] = None
+_auth_client: Optional[AsyncGoTrueClient] = None
 
 
-def get_supabase_client() -> Client:
+def get_supabase_client() -> "Client":
     """
     Returns a singleton Supabase client instance.
     Creates it on first call, returns the existing instance on subsequent calls.
+
+    This client is synchronous and blocks the event loop while it waits on
+    Supabase; async endpoints should use get_auth_client() instead.
     """
     global _supabase_client
 
     if _supabase_client is None:
+        # Imported on first use: the supabase package also loads the postgrest,
+        # storage, realtime and functions clients, which slows down startup
+        from supabase import create_client
+
         _supabase_client = create_client(
             settings.SUPABASE_PROJECT_URL,
             settings.SUPABASE_ANON_KEY
         )
 
     return _supabase_client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the shared keep-alive connection pool used for calls to Supabase.
+    It is normally opened by the app's lifespan handler, but is created on
+    first use if it isn't open yet.
+    """
+    global _http_client
+
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2=settings.SUPABASE_HTTP2,
+            timeout=settings.SUPABASE_HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=settings.SUPABASE_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SUPABASE_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.SUPABASE_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+
+    return _http_client
+
+
+def get_auth_client() -> AsyncGoTrueClient:
+    """
+    Returns a singleton async GoTrue (Supabase auth) client
+    that sends its requests through the shared connection pool.
+    """
+    global _auth_client
+
+    if _auth_client is None:
+        _auth_client = AsyncGoTrueClient(
+            url=SUPABASE_AUTH_URL,
+            headers=SUPABASE_AUTH_HEADERS,
+            http_client=get_http_client(),
+            auto_refresh_token=False,
+            persist_session=False,
+        )
+
+    return _auth_client
+
+
+async def exchange_code_for_session(auth_code: str, code_verifier: str) -> AuthResponse:
+    """
+    Exchanges a PKCE authorization code for a session.
+
+    The async client's exchange_code_for_session doesn't await its request in
+    this gotrue version, so the token endpoint is called directly. HTTP errors
+    are raised as gotrue's AuthError types, like the client's own calls.
+    """
+    response = await get_http_client().post(
+        f"{SUPABASE_AUTH_URL}/token",
+        params={"grant_type": "pkce"},
+        json={"auth_code": auth_code, "code_verifier": code_verifier},
+        headers=SUPABASE_AUTH_HEADERS,
+    )
+    try:
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        raise handle_exception(e)
+    return parse_auth_response(response.json())
+
+
+async def open_http_client() -> None:
+    """
+    Opens the shared connection pool. Called on application startup.
+    """
+    get_http_client()
+
+
+async def close_http_client() -> None:
+    """
+    Closes the shared connection pool and the clients using it.
+    Called on application shutdown.
+    """
+    global _http_client, _auth_client
+
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
+    _auth_client = None
@@ -1,16 +1,49 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.api.api import api_router
-from app.db.supabase_client import get_supabase_client
+from app.core.admission import AdmissionControlMiddleware
+from app.core.metrics import MetricsMiddleware, StatsCollector, register, render_metrics
+from app.core.security import signing_keys
+from app.core.token_cache import token_cache
+from app.db.supabase_client import open_http_client, close_http_client
 import uvicorn
 from app.core.config import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the shared Supabase connection pool and warm the signing key cache
+    await open_http_client()
+    if settings.AUTH_VERIFICATION_MODE != "remote":
+        await signing_keys.refresh()
+    yield
+    await close_http_client()
+
+
 app = FastAPI(
     title="BrokeNoMore",
     description="BrokeNoMore is a platform for people to get help when they are in need.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
-# Initialize database connection
-get_supabase_client()
+register(StatsCollector("token_cache", "Verified token cache", token_cache.stats))
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+        queue_size=settings.ADMISSION_QUEUE_SIZE,
+        queue_timeout_ms=settings.ADMISSION_QUEUE_TIMEOUT_MS,
+        retry_after_seconds=settings.ADMISSION_RETRY_AFTER_SECONDS,
+        route_limits=settings.ADMISSION_ROUTE_LIMITS,
+        exempt_paths=settings.ADMISSION_EXEMPT_PATHS,
+        adaptive=settings.ADMISSION_ADAPTIVE,
+        min_in_flight=settings.ADMISSION_MIN_IN_FLIGHT,
+        latency_target_ms=settings.ADMISSION_LATENCY_TARGET_MS,
+    )
+# Added last so it wraps admission control and also times shed requests
+app.add_middleware(MetricsMiddleware, slow_request_threshold_ms=settings.SLOW_REQUEST_THRESHOLD_MS)
 
 # Include routers
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -26,5 +59,10 @@ async def health():
     return {"message": "BrokeNoMore Server is running."}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,15 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from pydantic import BaseModel
+
+
+class UserProfile(BaseModel):
+    """
+    Profile of the authenticated user, as returned by /users/me.
+    `created_at` is empty when the token was verified locally.
+    """
+    id: str
+    email: Optional[str] = None
+    user_metadata: Dict[str, Any] = {}
+    app_metadata: Dict[str, Any] = {}
+    created_at: Optional[datetime] = None
@@ -0,0 +1,326 @@
+"""
+Production entry point:
+
+    python -m app.serve                     # serve on $HOST:$PORT
+    python -m app.serve --measure-startup   # report import/startup time as JSON
+
+Loads the app once in a supervisor process, binds the listening socket and
+forks one uvicorn worker per available core (respecting CPU affinity and
+cgroup quotas, or WEB_CONCURRENCY). Workers run on uvloop with the httptools
+parser. The supervisor restarts workers that die, recycles them all on
+SIGHUP one at a time, and on SIGTERM/SIGINT lets them drain in-flight requests before exiting.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+from app.core.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+HEALTH_CHECK_INTERVAL = 0.5
+# Workers dying faster than this after starting count as a crash loop
+MIN_WORKER_LIFETIME = 5.0
+MAX_RAPID_RESTARTS = 10
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """
+    Returns the CPU limit imposed by the container's cgroup, if any.
+    """
+    try:
+        # cgroup v2
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus() -> int:
+    """
+    Number of CPUs this process may actually use.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return cpus
+
+
+def worker_count() -> int:
+    return settings.WEB_CONCURRENCY or available_cpus()
+
+
+def build_config() -> uvicorn.Config:
+    return uvicorn.Config(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        loop="uvloop",
+        http="httptools",
+        lifespan="on",
+        proxy_headers=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+        timeout_keep_alive=settings.KEEP_ALIVE_TIMEOUT_SECONDS,
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_TIMEOUT_SECONDS,
+        access_log=settings.ACCESS_LOG,
+    )
+
+
+class Supervisor:
+    """
+    Pre-fork process manager for uvicorn workers sharing one listening socket.
+    """
+
+    def __init__(self, config: uvicorn.Config, workers: int):
+        self.config = config
+        self.workers = workers
+        self.children: Dict[int, float] = {}  # pid -> start time
+        self.draining: Dict[int, float] = {}  # pid -> deadline to exit by
+        self.to_restart: List[int] = []
+        self.should_exit = False
+        self.restart_requested = False
+        self.rapid_restarts = 0
+
+    def _spawn(self, sock) -> None:
+        pid = os.fork()
+        if pid == 0:
+            # Worker: undo the supervisor's signal handlers, uvicorn installs its own
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(sig, signal.SIG_DFL)
+            server = uvicorn.Server(self.config)
+            try:
+                server.run(sockets=[sock])
+            except BaseException:
+                logger.exception("Worker [%d] crashed", os.getpid())
+                os._exit(1)
+            # A worker whose lifespan startup failed returns without having started
+            os._exit(0 if server.started else 1)
+        self.children[pid] = time.monotonic()
+
+    def _handle_exit(self, signum, frame) -> None:
+        self.should_exit = True
+
+    def _handle_restart(self, signum, frame) -> None:
+        self.restart_requested = True
+
+    def _reap(self) -> Dict[int, int]:
+        exited = {}
+        while self.children or self.draining:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            exited[pid] = os.waitstatus_to_exitcode(status)
+        return exited
+
+    def _stop(self, pids, timeout: float) -> None:
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + timeout
+        pending = set(pids)
+        while pending and time.monotonic() < deadline:
+            for pid in list(pending):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    pending.discard(pid)
+                    self.children.pop(pid, None)
+                    self.draining.pop(pid, None)
+            time.sleep(0.1)
+        for pid in pending:
+            logger.warning("Worker [%d] did not drain in time, killing it", pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            self.children.pop(pid, None)
+            self.draining.pop(pid, None)
+
+    def _drain(self, pid: int, timeout: float) -> None:
+        """
+        Asks a worker to finish its in-flight requests and exit, without
+        waiting for it; the main loop reaps it or kills it after `timeout`.
+        """
+        self.children.pop(pid, None)
+        self.draining[pid] = time.monotonic() + timeout
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def _step_restart(self, sock, drain_timeout: float) -> None:
+        """
+        Replaces the next old worker once the previous one has drained, so
+        capacity never drops by more than one worker during a restart.
+        """
+        if self.draining:
+            return
+        while self.to_restart:
+            pid = self.to_restart.pop(0)
+            if pid in self.children:
+                self._spawn(sock)
+                self._drain(pid, drain_timeout)
+                return
+
+    def _kill_overdue(self) -> None:
+        now = time.monotonic()
+        for pid, deadline in self.draining.items():
+            if now >= deadline:
+                logger.warning("Worker [%d] did not drain in time, killing it", pid)
+                # Killed once; it is reaped by the next _reap()
+                self.draining[pid] = float("inf")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def run(self, sock) -> None:
+        drain_timeout = (self.config.timeout_graceful_shutdown or 0) + 5
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        signal.signal(signal.SIGINT, self._handle_exit)
+        signal.signal(signal.SIGHUP, self._handle_restart)
+
+        logger.info("Starting %d workers [supervisor %d]", self.workers, os.getpid())
+        for _ in range(self.workers):
+            self._spawn(sock)
+
+        while not self.should_exit:
+            if self.restart_requested:
+                self.restart_requested = False
+                logger.info("Restarting workers")
+                self.to_restart = list(self.children)
+            self._step_restart(sock, drain_timeout)
+            self._kill_overdue()
+
+            for pid, exit_code in self._reap().items():
+                if self.draining.pop(pid, None) is not None:
+                    continue
+                started = self.children.pop(pid, time.monotonic())
+                if self.should_exit:
+                    continue
+                logger.warning("Worker [%d] exited with code %d, restarting", pid, exit_code)
+                if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                    self.rapid_restarts += 1
+                    if self.rapid_restarts > MAX_RAPID_RESTARTS:
+                        logger.error("Workers keep crashing on startup, giving up")
+                        self.should_exit = True
+                        continue
+                else:
+                    self.rapid_restarts = 0
+                self._spawn(sock)
+
+            time.sleep(HEALTH_CHECK_INTERVAL)
+
+        logger.info("Draining %d workers", len(self.children) + len(self.draining))
+        self._stop(list(self.children) + list(self.draining), drain_timeout)
+        sock.close()
+        if self.rapid_restarts > MAX_RAPID_RESTARTS:
+            sys.exit(1)
+
+
+def serve() -> None:
+    config = build_config()
+    # Import the app once here so forked workers start without re-importing it
+    config.load()
+    sock = config.bind_socket()
+    workers = worker_count()
+    if workers == 1:
+        server = uvicorn.Server(config)
+        server.run(sockets=[sock])
+        if not server.started:
+            sys.exit(1)
+        return
+    Supervisor(config, workers).run(sock)
+
+
+MEASURE_SCRIPT = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def startup():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(startup())
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "modules": len(sys.modules),
+    "supabase_subclients": sorted(
+        m for m in ("supabase", "postgrest", "storage3", "realtime", "supafunc") if m in sys.modules
+    ),
+}))
+"""
+
+
+def measure_startup(repeat: int) -> dict:
+    """
+    Imports and starts the app in fresh interpreters and reports median
+    import and lifespan startup times.
+    """
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", MEASURE_SCRIPT], text=True)
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "python": sys.version.split()[0],
+        "runs": repeat,
+        "import_ms": round(statistics.median(r["import_ms"] for r in runs), 1),
+        "startup_ms": round(statistics.median(r["startup_ms"] for r in runs), 1),
+        "modules": runs[-1]["modules"],
+        "supabase_subclients": runs[-1]["supabase_subclients"],
+        "workers": worker_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--measure-startup", action="store_true", help="report startup time instead of serving")
+    parser.add_argument("--repeat", type=int, default=5, help="runs for --measure-startup")
+    args = parser.parse_args()
+
+    if args.measure_startup:
+        print(json.dumps(measure_startup(args.repeat), indent=2))
+        return
+    serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# BrokeNoMore
@@ -0,0 +1,170 @@
+"""
+A local stand-in for Supabase auth (GoTrue) used by the benchmarks.
+
+Serves real-shaped responses for the endpoints this service calls, with
+configurable artificial latency and error rate:
+
+    python -m benchmarks.fake_gotrue --port 9999 --latency-ms 20 --error-rate 0.01
+
+Access tokens are verified with the same HS256 secret the benchmark signs them with.
+"""
+import argparse
+import asyncio
+import random
+import secrets
+import time
+import uuid
+from urllib.parse import urlencode
+
+import jwt
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, RedirectResponse
+from starlette.routing import Route
+
+DEFAULT_JWT_SECRET = "benchmark-jwt-secret-with-at-least-32-bytes"
+USER_TIMESTAMP = "2024-01-01T00:00:00.000000Z"
+
+
+def _error(status_code: int, error_code: str, msg: str) -> JSONResponse:
+    return JSONResponse(
+        {"code": status_code, "error_code": error_code, "msg": msg},
+        status_code=status_code,
+    )
+
+
+def user_payload(claims: dict) -> dict:
+    """
+    Builds a GoTrue /user response for the user described by token claims.
+    """
+    user_id = claims["sub"]
+    email = claims.get("email", f"{user_id}@example.com")
+    identity_data = {
+        "email": email,
+        "email_verified": True,
+        "full_name": "Benchmark User",
+        "avatar_url": "https://example.com/avatar.png",
+        "provider_id": user_id,
+        "sub": user_id,
+    }
+    return {
+        "id": user_id,
+        "aud": "authenticated",
+        "role": "authenticated",
+        "email": email,
+        "email_confirmed_at": USER_TIMESTAMP,
+        "phone": "",
+        "confirmed_at": USER_TIMESTAMP,
+        "last_sign_in_at": USER_TIMESTAMP,
+        "app_metadata": {"provider": "google", "providers": ["google"]},
+        "user_metadata": identity_data,
+        "identities": [
+            {
+                "identity_id": user_id,
+                "id": user_id,
+                "user_id": user_id,
+                "identity_data": identity_data,
+                "provider": "google",
+                "last_sign_in_at": USER_TIMESTAMP,
+                "created_at": USER_TIMESTAMP,
+                "updated_at": USER_TIMESTAMP,
+                "email": email,
+            }
+        ],
+        "created_at": USER_TIMESTAMP,
+        "updated_at": USER_TIMESTAMP,
+        "is_anonymous": False,
+    }
+
+
+def create_app(latency_ms: float = 0.0, error_rate: float = 0.0, jwt_secret: str = DEFAULT_JWT_SECRET) -> Starlette:
+    """
+    Returns the fake GoTrue ASGI app.
+    Every /auth/v1 request waits `latency_ms` and fails with a 500 with probability `error_rate`.
+    """
+
+    async def simulate_upstream() -> bool:
+        if latency_ms > 0:
+            await asyncio.sleep(latency_ms / 1000)
+        return random.random() < error_rate
+
+    async def health(request: Request):
+        return JSONResponse({"version": "fake", "name": "GoTrue", "description": "Benchmark stand-in"})
+
+    async def get_user(request: Request):
+        if await simulate_upstream():
+            return _error(500, "unexpected_failure", "Simulated upstream failure")
+        authorization = request.headers.get("authorization", "")
+        token = authorization[len("Bearer "):] if authorization.startswith("Bearer ") else ""
+        try:
+            claims = jwt.decode(token, jwt_secret, algorithms=["HS256"], audience="authenticated")
+        except jwt.PyJWTError as e:
+            return _error(401, "bad_jwt", f"invalid JWT: unable to parse or verify signature, {e}")
+        return JSONResponse(user_payload(claims))
+
+    async def authorize(request: Request):
+        if await simulate_upstream():
+            return _error(500, "unexpected_failure", "Simulated upstream failure")
+        if request.query_params.get("provider") != "google":
+            return _error(400, "validation_failed", "Unsupported provider: Provider is not enabled")
+        query = urlencode({
+            "client_id": "benchmark.apps.googleusercontent.com",
+            "redirect_uri": f"{request.base_url}auth/v1/callback",
+            "response_type": "code",
+            "scope": "email profile",
+            "state": secrets.token_urlsafe(32),
+        })
+        return RedirectResponse(f"https://accounts.google.com/o/oauth2/v2/auth?{query}", status_code=302)
+
+    async def token(request: Request):
+        if await simulate_upstream():
+            return _error(500, "unexpected_failure", "Simulated upstream failure")
+        body = await request.json()
+        if request.query_params.get("grant_type") != "pkce" or not body.get("auth_code") or not body.get("code_verifier"):
+            return _error(400, "validation_failed", "invalid request: both auth code and code verifier should be non-empty")
+        now = int(time.time())
+        claims = {
+            "sub": str(uuid.uuid4()),
+            "aud": "authenticated",
+            "role": "authenticated",
+            "iss": f"{request.base_url}auth/v1",
+            "iat": now,
+            "exp": now + 3600,
+        }
+        return JSONResponse({
+            "access_token": jwt.encode(claims, jwt_secret, algorithm="HS256"),
+            "token_type": "bearer",
+            "expires_in": 3600,
+            "expires_at": now + 3600,
+            "refresh_token": secrets.token_urlsafe(16),
+            "user": user_payload(claims),
+        })
+
+    async def jwks(request: Request):
+        return JSONResponse({"keys": []})
+
+    return Starlette(routes=[
+        Route("/auth/v1/health", health),
+        Route("/auth/v1/user", get_user),
+        Route("/auth/v1/authorize", authorize),
+        Route("/auth/v1/token", token, methods=["POST"]),
+        Route("/auth/v1/.well-known/jwks.json", jwks),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--jwt-secret", default=DEFAULT_JWT_SECRET)
+    args = parser.parse_args()
+
+    app = create_app(args.latency_ms, args.error_rate, args.jwt_secret)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Offline load benchmark for the BrokeNoMore API.
+
+Starts the fake GoTrue server and the app (pointed at it through
+SUPABASE_PROJECT_URL), drives each endpoint at the given concurrency
+and prints RPS and latency percentiles as JSON:
+
+    python -m benchmarks.run --concurrency 50 --duration 10 --output bench.json
+
+By default every /users/me request carries a fresh token, so each one goes
+through verification (and, in remote mode, the fake upstream). Use
+--distinct-tokens N to cycle through N tokens and measure the token cache
+instead. /auth/login never calls upstream.
+
+Run it on two commits and compare the JSON to spot regressions.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from typing import Callable, Dict, List
+
+import httpx
+import jwt
+
+from benchmarks.fake_gotrue import DEFAULT_JWT_SECRET
+
+ENDPOINTS = {
+    "root": "/",
+    "health": "/health",
+    "login": "/api/v1/auth/login",
+    "users_me": "/api/v1/users/me",
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _sign(claims: dict, secret: str) -> str:
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def _wait_until_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not become ready in {timeout}s")
+            await asyncio.sleep(0.1)
+
+
+def _token_headers(fake_url: str, secret: str) -> Dict[str, str]:
+    now = int(time.time())
+    token = _sign({
+        "sub": str(uuid.uuid4()),
+        "aud": "authenticated",
+        "role": "authenticated",
+        "iss": f"{fake_url}/auth/v1",
+        "email": "benchmark@example.com",
+        "iat": now,
+        "exp": now + 3600,
+        "app_metadata": {"provider": "google", "providers": ["google"]},
+        "user_metadata": {"full_name": "Benchmark User"},
+    }, secret)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _header_source(fake_url: str, secret: str, distinct_tokens: int) -> Callable[[], Dict[str, str]]:
+    """
+    Returns a function giving the headers for the next request: a new token
+    every time, or the next one of a pool of `distinct_tokens`.
+    """
+    if distinct_tokens <= 0:
+        return lambda: _token_headers(fake_url, secret)
+    pool = itertools.cycle([_token_headers(fake_url, secret) for _ in range(distinct_tokens)])
+    return lambda: next(pool)
+
+
+async def _drive(client: httpx.AsyncClient, path: str, next_headers: Callable[[], Dict[str, str]], concurrency: int, duration: float) -> dict:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, headers=next_headers())
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            key = str(response.status_code)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50) * 1000, 3),
+            "p95": round(_percentile(latencies, 95) * 1000, 3),
+            "p99": round(_percentile(latencies, 99) * 1000, 3),
+            "max": round((latencies[-1] if latencies else 0.0) * 1000, 3),
+        },
+        "status_codes": statuses,
+    }
+
+
+async def run_benchmark(args) -> dict:
+    fake_port = _free_port()
+    app_port = _free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    app_url = f"http://127.0.0.1:{app_port}"
+
+    fake_server = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_gotrue",
+        "--port", str(fake_port),
+        "--latency-ms", str(args.upstream_latency_ms),
+        "--error-rate", str(args.upstream_error_rate),
+        "--jwt-secret", args.jwt_secret,
+    ])
+    env = {
+        **os.environ,
+        "SUPABASE_PROJECT_URL": fake_url,
+        "SUPABASE_ANON_KEY": _sign({"role": "anon", "iss": "supabase"}, args.jwt_secret),
+        "SUPABASE_JWT_SECRET": args.jwt_secret,
+        "GOOGLE_CLIENT_ID": "benchmark.apps.googleusercontent.com",
+        "GOOGLE_CLIENT_SECRET": "benchmark",
+        "GOOGLE_REDIRECT_URI": "http://localhost:3000/auth/callback",
+        "AUTH_VERIFICATION_MODE": args.auth_mode,
+        "HOST": "127.0.0.1",
+        "PORT": str(app_port),
+        "WEB_CONCURRENCY": str(args.workers),
+    }
+    app_server = subprocess.Popen([sys.executable, "-m", "app.serve"], env=env)
+
+    try:
+        await _wait_until_ready(f"{fake_url}/auth/v1/health")
+        await _wait_until_ready(f"{app_url}/health")
+
+        next_headers = _header_source(fake_url, args.jwt_secret, args.distinct_tokens)
+
+        results = {}
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=args.timeout) as client:
+            for name in args.endpoints:
+                path = ENDPOINTS[name]
+                if args.warmup > 0:
+                    await _drive(client, path, next_headers, args.concurrency, args.warmup)
+                results[name] = await _drive(client, path, next_headers, args.concurrency, args.duration)
+    finally:
+        for process in (app_server, fake_server):
+            process.terminate()
+        for process in (app_server, fake_server):
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    return {
+        "revision": _git_revision(),
+        "timestamp": int(time.time()),
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "workers": args.workers,
+            "auth_mode": args.auth_mode,
+            "distinct_tokens": args.distinct_tokens,
+            "upstream_latency_ms": args.upstream_latency_ms,
+            "upstream_error_rate": args.upstream_error_rate,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per endpoint")
+    parser.add_argument("--warmup", type=float, default=1.0, help="warmup seconds per endpoint")
+    parser.add_argument("--timeout", type=float, default=30.0, help="client timeout in seconds")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, 0 for one per CPU")
+    parser.add_argument("--auth-mode", default="remote", choices=["local", "local_then_remote", "remote"])
+    parser.add_argument(
+        "--distinct-tokens", type=int, default=0,
+        help="cycle through this many tokens, 0 for a new token per request",
+    )
+    parser.add_argument("--upstream-latency-ms", type=float, default=20.0)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--jwt-secret", default=DEFAULT_JWT_SECRET)
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()